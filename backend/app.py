@@ -5,10 +5,19 @@ Uses LangChain RAG with Google Gemini for intelligent schedule generation
 """
 
 from flask import Flask, request, jsonify, session
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 import pandas as pd
+import orjson
 import os
+import re
+import copy
+import hashlib
+import threading
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
 import logging
 from werkzeug.security import generate_password_hash, check_password_hash
 from pymongo import MongoClient, ASCENDING
@@ -23,36 +32,63 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify and request.get_json"""
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    @staticmethod
+    def _default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self._default, option=self.options)
+        return self._app.response_class(body, mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 # Secret key for sessions
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-change-me')
 
 # Configure CORS for production domains
-import re
+# Production domains are matched exactly; only wildcard origins need a regex
+EXACT_ALLOWED_ORIGINS = frozenset([
+    'https://berkeleyfouryearplan.com',
+    'https://www.berkeleyfouryearplan.com',
+])
+
+# Additional origins from env
+EXTRA_ALLOWED_ORIGINS = frozenset(
+    o.strip() for o in os.getenv('ALLOWED_ORIGINS', '').split(',') if o.strip()
+)
+
+# Compiled once at import; the callback runs on every cross-origin request
+CORS_ORIGIN_PATTERNS = [
+    re.compile(r'^http://localhost:\d+$'),
+    re.compile(r'^https://.*\.vercel\.app$'),  # All Vercel preview/prod URLs
+]
 
 def cors_origin_callback(origin):
     """Check if origin is allowed - supports Vercel preview URLs"""
     if not origin:
         return False
 
-    allowed_patterns = [
-        r'^https://berkeleyfouryearplan\.com$',
-        r'^https://www\.berkeleyfouryearplan\.com$',
-        r'^http://localhost:\d+$',
-        r'^https://.*\.vercel\.app$',  # All Vercel preview/prod URLs
-    ]
+    if origin in EXACT_ALLOWED_ORIGINS or origin in EXTRA_ALLOWED_ORIGINS:
+        return True
 
-    for pattern in allowed_patterns:
-        if re.match(pattern, origin):
+    for pattern in CORS_ORIGIN_PATTERNS:
+        if pattern.match(origin):
             return True
 
-    # Check additional origins from env
-    extra_origins = os.getenv('ALLOWED_ORIGINS', '')
-    if extra_origins:
-        for o in extra_origins.split(','):
-            if origin == o.strip():
-                return True
-
     return False
 
 # Enable CORS with credentials for frontend
@@ -62,6 +98,11 @@ CORS(app,
      allow_headers=['Content-Type', 'Authorization'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 
+# Compress larger JSON responses (plans, catalog search), preferring Brotli
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
 # Configure session cookies for production
 app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_ENV') == 'production'
 app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -69,17 +110,51 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'None' if os.getenv('FLASK_ENV') == 'pro
 
 # Global variables
 courses_df = None
+course_index = {}
+course_search_df = None
+# Bumped on every catalog publish; part of the catalog-derived cache keys
+catalog_generation = 0
+course_csv_path = None
+course_csv_mtime = None
 majors_data = {}
+majors_list_json = b'[]'
+majors_list_etag = None
+major_details_json = {}
+major_courses = {}
 rag_pipeline = None
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
 MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'berkeley_planner')
+# Pool sized for one gunicorn worker's threads rather than pymongo's default of 100
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '20'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
 mongo_client: MongoClient | None = None
 db = None
 
+# Explicit password hashing cost (werkzeug method string); existing hashes keep
+# verifying because the method is stored in each hash
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+# Max number of distinct AI responses kept per worker
+AI_CACHE_SIZE = 1024
+# Max results from /api/search-courses, and rows scanned per step of the fallback search
+SEARCH_LIMIT = 10
+SEARCH_CHUNK_SIZE = 2048
+# Seconds between checks of the course CSV for changes (0 disables reloading)
+COURSE_RELOAD_INTERVAL = int(os.getenv('COURSE_RELOAD_INTERVAL', '60'))
+
 def init_db():
     global mongo_client, db
     try:
-        mongo_client = MongoClient(MONGODB_URI)
+        # tz_aware so stored BSON dates come back as UTC datetimes and serialize with an offset
+        # Each gunicorn worker imports the app after forking, so every worker owns its pool
+        mongo_client = MongoClient(
+            MONGODB_URI,
+            tz_aware=True,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            compressors='zstd,zlib',
+            appname='berkeley-planner'
+        )
         db = mongo_client[MONGO_DB_NAME]
         # indexes
         db.users.create_index([('email', ASCENDING)], unique=True)
@@ -89,9 +164,34 @@ def init_db():
         logger.error(f"Failed to initialize MongoDB: {e}")
         raise
 
+# Unit counts; downcast to a small integer dtype when every value is whole
+UNIT_COLUMNS = ['Credits - Units - Minimum Units', 'Credits - Units - Maximum Units']
+
+# Only the columns the planner, search and RAG pipeline use are read from the CSV
+COURSE_COLUMNS = [
+    'Subject',
+    'Course Number',
+    'Department(s)',
+    *UNIT_COLUMNS,
+    'Terms Offered',
+    'Course Description',
+]
+
+# Repeated labels are stored as categoricals; codes and descriptions stay strings.
+# Unit columns are read as text and converted in set_course_data, since blank
+# cells make the pyarrow reader fail to cast an undeclared integer column.
+COURSE_DTYPES = {
+    'Subject': 'category',
+    'Department(s)': 'category',
+    'Terms Offered': 'category',
+    'Course Number': 'string[pyarrow]',
+    'Course Description': 'string[pyarrow]',
+    **{column: 'string[pyarrow]' for column in UNIT_COLUMNS},
+}
+
 def load_course_data():
     """Load course data from CSV"""
-    global courses_df
+    global course_csv_path, course_csv_mtime
     try:
         # Check multiple locations for CSV (production vs development)
         csv_paths = [
@@ -107,14 +207,115 @@ def load_course_data():
                 break
 
         if csv_path:
-            courses_df = pd.read_csv(csv_path)
-            logger.info(f"Loaded {len(courses_df)} courses from {csv_path}")
+            course_csv_mtime = os.path.getmtime(csv_path)
+            df = read_course_csv(csv_path)
+            course_csv_path = csv_path
+            logger.info(f"Loaded {len(df)} courses from {csv_path}")
         else:
-            courses_df = create_sample_course_data()
+            df = create_sample_course_data()
             logger.info("Created sample course data (no CSV found)")
     except Exception as e:
         logger.error(f"Error loading course data: {e}")
-        courses_df = create_sample_course_data()
+        df = create_sample_course_data()
+
+    set_course_data(df)
+
+def read_course_csv(csv_path):
+    """Read the course catalog CSV with explicit dtypes"""
+    return pd.read_csv(csv_path, engine='pyarrow', usecols=COURSE_COLUMNS, dtype=COURSE_DTYPES)
+
+def set_course_data(df):
+    """Normalize a course DataFrame and publish it together with its lookup tables"""
+    global courses_df, course_index, course_search_df, catalog_generation
+
+    for column in UNIT_COLUMNS:
+        if column in df:
+            units = pd.to_numeric(df[column], errors='coerce').fillna(0)
+            # Whole-number columns shrink to the smallest integer dtype that fits; a
+            # column with half-unit courses (e.g. 0.5, 1.5) stays float so they survive
+            df[column] = pd.to_numeric(units, downcast='integer')
+
+    # Build everything first, then rebind the globals so readers never see a half-built index
+    index = build_course_index(df)
+    search_df = build_course_search_df(df)
+    courses_df, course_index, course_search_df = df, index, search_df
+    catalog_generation += 1
+    # Cached plans and course options embed course details from the previous catalog;
+    # builders still running against it finish under the old generation and aren't cached
+    cached_basic_plan.cache_clear()
+    cached_course_options.cache_clear()
+    # cached_rag_schedule and cached_ai_suggestions are kept: RAG answers come from the
+    # vector store built at startup, which a catalog reload does not rebuild
+
+def build_course_index(df):
+    """Index courses by (subject, number) so lookups avoid scanning the DataFrame"""
+    index = {}
+    for course in df.to_dict('records'):
+        key = (str(course['Subject']), str(course['Course Number']))
+        # Keep the first row for duplicate codes, matching the old iloc[0] behaviour
+        index.setdefault(key, course)
+    return index
+
+def build_course_search_df(df):
+    """Precompute upper-cased course codes and titles for the fallback search"""
+    codes = df['Subject'].astype(str) + ' ' + df['Course Number'].astype(str)
+    titles = df['Course Description'].fillna('').astype(str)
+    return pd.DataFrame({
+        'code': codes,
+        'code_upper': codes.str.upper(),
+        'title': titles,
+        'title_upper': titles.str.upper(),
+        'units': df.get('Credits - Units - Minimum Units', 4),
+        'terms': df.get('Terms Offered', 'Fall, Spring'),
+    })
+
+def reload_course_data_if_changed():
+    """Re-read the course CSV if its modification time changed since the last load"""
+    global course_csv_mtime
+    if course_csv_path is None:
+        return False
+
+    try:
+        mtime = os.path.getmtime(course_csv_path)
+    except OSError as e:
+        logger.warning(f"Cannot stat course data {course_csv_path}: {e}")
+        return False
+
+    if mtime == course_csv_mtime:
+        return False
+
+    # Record the new mtime up front so a bad file is not re-read every interval
+    course_csv_mtime = mtime
+    try:
+        df = read_course_csv(course_csv_path)
+    except Exception as e:
+        logger.error(f"Error reloading course data, keeping previous catalog: {e}")
+        return False
+
+    set_course_data(df)
+    logger.info(f"Reloaded {len(df)} courses from {course_csv_path}")
+    return True
+
+def watch_course_data(interval):
+    """Poll the course CSV forever, reloading it when it changes"""
+    while True:
+        time.sleep(interval)
+        try:
+            reload_course_data_if_changed()
+        except Exception as e:
+            logger.error(f"Course data watcher error: {e}")
+
+def start_course_data_watcher():
+    """Start the background course data watcher unless disabled"""
+    if COURSE_RELOAD_INTERVAL <= 0 or course_csv_path is None:
+        return
+    threading.Thread(
+        target=watch_course_data,
+        args=(COURSE_RELOAD_INTERVAL,),
+        name='course-data-watcher',
+        daemon=True
+    ).start()
+    logger.info(f"Watching {course_csv_path} for changes every {COURSE_RELOAD_INTERVAL}s")
 
 def create_sample_course_data():
     """Create sample course data"""
@@ -298,89 +499,105 @@ def create_sample_course_data():
     ]
     return pd.DataFrame(sample_courses)
 
-def load_majors_data():
-    """Load majors and their requirements"""
-    global majors_data
-
-    # Create a comprehensive list of all UC Berkeley majors
-    all_majors = [
-        # College of Letters and Science - Arts and Humanities
-        "Ancient Greek and Roman Studies", "Art History", "Art Practice", "Celtic Studies",
-        "Comparative Literature", "Dutch Studies", "East Asian Languages and Cultures",
-        "English", "Film and Media", "French", "German", "Italian Studies",
-        "Middle Eastern Languages and Cultures", "Music", "Near Eastern Civilizations",
-        "Philosophy", "Rhetoric", "Scandinavian", "Slavic", "South and Southeast Asian Studies",
-        "Spanish and Portuguese", "Theater, Dance, and Performance Studies",
-
-        # College of Letters and Science - Biological Sciences
-        "Integrative Biology", "Molecular and Cell Biology", "Neuroscience", "Public Health",
-        "Robinson Life Science, Business, and Entrepreneurship Program",
-
-        # College of Letters and Science - Interdisciplinary Studies
-        "American Studies", "Interdisciplinary Studies", "Legal Studies", "Media Studies",
-
-        # College of Letters and Science - Mathematical and Physical Sciences
-        "Analytics", "Astrophysics", "Chemistry", "Earth and Planetary Science",
-        "Mathematics", "Physics",
-
-        # College of Letters and Science - Social Sciences
-        "African American Studies", "Anthropology", "Asian American and Asian Diaspora Studies",
-        "Chicano Studies", "Chicanx Latinx Studies", "Cognitive Science", "Economics",
-        "Educational Sciences", "Ethnic Studies", "Gender and Women's Studies", "Geography",
-        "Global Studies", "History", "Linguistics", "Native American Studies",
-        "Political Economy", "Political Science", "Psychology", "Social Welfare", "Sociology",
-
-        # College of Computing, Data Science, and Society
-        "Computer Science", "Data Science", "Statistics",
-
-        # College of Chemistry
-        "Chemical Biology", "Chemical Engineering",
-
-        # College of Engineering
+# Create a comprehensive list of all UC Berkeley majors
+ALL_MAJORS = [
+    # College of Letters and Science - Arts and Humanities
+    "Ancient Greek and Roman Studies", "Art History", "Art Practice", "Celtic Studies",
+    "Comparative Literature", "Dutch Studies", "East Asian Languages and Cultures",
+    "English", "Film and Media", "French", "German", "Italian Studies",
+    "Middle Eastern Languages and Cultures", "Music", "Near Eastern Civilizations",
+    "Philosophy", "Rhetoric", "Scandinavian", "Slavic", "South and Southeast Asian Studies",
+    "Spanish and Portuguese", "Theater, Dance, and Performance Studies",
+
+    # College of Letters and Science - Biological Sciences
+    "Integrative Biology", "Molecular and Cell Biology", "Neuroscience", "Public Health",
+    "Robinson Life Science, Business, and Entrepreneurship Program",
+
+    # College of Letters and Science - Interdisciplinary Studies
+    "American Studies", "Interdisciplinary Studies", "Legal Studies", "Media Studies",
+
+    # College of Letters and Science - Mathematical and Physical Sciences
+    "Analytics", "Astrophysics", "Chemistry", "Earth and Planetary Science",
+    "Mathematics", "Physics",
+
+    # College of Letters and Science - Social Sciences
+    "African American Studies", "Anthropology", "Asian American and Asian Diaspora Studies",
+    "Chicano Studies", "Chicanx Latinx Studies", "Cognitive Science", "Economics",
+    "Educational Sciences", "Ethnic Studies", "Gender and Women's Studies", "Geography",
+    "Global Studies", "History", "Linguistics", "Native American Studies",
+    "Political Economy", "Political Science", "Psychology", "Social Welfare", "Sociology",
+
+    # College of Computing, Data Science, and Society
+    "Computer Science", "Data Science", "Statistics",
+
+    # College of Chemistry
+    "Chemical Biology", "Chemical Engineering",
+
+    # College of Engineering
+    "Aerospace Engineering", "Bioengineering", "Civil Engineering",
+    "Electrical and Computer Engineering", "Environmental Engineering Sciences",
+    "Energy Engineering", "Engineering Mathematics and Statistics", "Engineering Physics",
+    "Environmental Engineering Science", "Industrial Engineering and Operations Research",
+    "Materials Science and Engineering", "Mechanical Engineering", "Nuclear Engineering",
+
+    # College of Environmental Design
+    "Architecture", "Landscape Architecture", "Sustainable Environmental Design", "Urban Studies",
+
+    # Rausser College of Natural Resources
+    "Conservation and Resource Studies", "Ecosystem Management and Forestry",
+    "Environmental Economics and Policy", "Environmental Sciences", "Genetics and Plant Biology",
+    "Microbial Biology", "Molecular Environmental Biology", "Nutrition & Metabolic Biology",
+    "Society and Environment",
+
+    # Haas School of Business
+    "Business Administration"
+]
+
+# Majors outside the College of Letters and Science, grouped by college
+COLLEGE_MAJORS = {
+    "College of Computing, Data Science, and Society": [
+        "Computer Science", "Data Science", "Statistics"
+    ],
+    "College of Chemistry": ["Chemical Biology", "Chemical Engineering"],
+    "College of Engineering": [
         "Aerospace Engineering", "Bioengineering", "Civil Engineering",
         "Electrical and Computer Engineering", "Environmental Engineering Sciences",
         "Energy Engineering", "Engineering Mathematics and Statistics", "Engineering Physics",
         "Environmental Engineering Science", "Industrial Engineering and Operations Research",
-        "Materials Science and Engineering", "Mechanical Engineering", "Nuclear Engineering",
-
-        # College of Environmental Design
-        "Architecture", "Landscape Architecture", "Sustainable Environmental Design", "Urban Studies",
-
-        # Rausser College of Natural Resources
+        "Materials Science and Engineering", "Mechanical Engineering", "Nuclear Engineering"
+    ],
+    "College of Environmental Design": [
+        "Architecture", "Landscape Architecture", "Sustainable Environmental Design", "Urban Studies"
+    ],
+    "Rausser College of Natural Resources": [
         "Conservation and Resource Studies", "Ecosystem Management and Forestry",
         "Environmental Economics and Policy", "Environmental Sciences", "Genetics and Plant Biology",
         "Microbial Biology", "Molecular Environmental Biology", "Nutrition & Metabolic Biology",
-        "Society and Environment",
+        "Society and Environment"
+    ],
+    "Haas School of Business": ["Business Administration"],
+}
+DEFAULT_COLLEGE = "College of Letters and Science"
+
+# Inverted once so each major's college is a single dict lookup
+COLLEGE_BY_MAJOR = {
+    major: college
+    for college, majors in COLLEGE_MAJORS.items()
+    for major in majors
+}
+
+def json_etag(body):
+    """Short content hash of a JSON payload, used as its ETag"""
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
 
-        # Haas School of Business
-        "Business Administration"
-    ]
+def load_majors_data():
+    """Load majors and their requirements"""
+    global majors_data, majors_list_json, majors_list_etag, major_details_json, major_courses
 
     # Create a basic structure for all majors
     majors_data = {}
-    for major in all_majors:
-        # Determine college based on major name
-        if major in ["Computer Science", "Data Science", "Statistics"]:
-            college = "College of Computing, Data Science, and Society"
-        elif major in ["Chemical Biology", "Chemical Engineering"]:
-            college = "College of Chemistry"
-        elif major in ["Aerospace Engineering", "Bioengineering", "Civil Engineering",
-                      "Electrical and Computer Engineering", "Environmental Engineering Sciences",
-                      "Energy Engineering", "Engineering Mathematics and Statistics", "Engineering Physics",
-                      "Environmental Engineering Science", "Industrial Engineering and Operations Research",
-                      "Materials Science and Engineering", "Mechanical Engineering", "Nuclear Engineering"]:
-            college = "College of Engineering"
-        elif major in ["Architecture", "Landscape Architecture", "Sustainable Environmental Design", "Urban Studies"]:
-            college = "College of Environmental Design"
-        elif major in ["Conservation and Resource Studies", "Ecosystem Management and Forestry",
-                      "Environmental Economics and Policy", "Environmental Sciences", "Genetics and Plant Biology",
-                      "Microbial Biology", "Molecular Environmental Biology", "Nutrition & Metabolic Biology",
-                      "Society and Environment"]:
-            college = "Rausser College of Natural Resources"
-        elif major == "Business Administration":
-            college = "Haas School of Business"
-        else:
-            college = "College of Letters and Science"
+    for major in ALL_MAJORS:
+        college = COLLEGE_BY_MAJOR.get(major, DEFAULT_COLLEGE)
 
         # Create basic requirements structure for each major
         majors_data[major] = {
@@ -561,6 +778,26 @@ def load_majors_data():
         if major in majors_data:
             majors_data[major] = details
 
+    # Majors never change after load, so encode the payloads and their ETags once
+    majors_list_json = orjson.dumps(list(majors_data))
+    majors_list_etag = json_etag(majors_list_json)
+    major_details_json = {}
+    for major, major_info in majors_data.items():
+        body = orjson.dumps(major_info)
+        major_details_json[major] = (body, json_etag(body))
+
+    # Flatten each major's requirements to (type, name, code, subject, number) rows
+    major_courses = {}
+    for major, major_info in majors_data.items():
+        rows = []
+        for req_type, requirements in major_info['requirements'].items():
+            for req in requirements:
+                for course in req['courses']:
+                    parts = course.split()
+                    if len(parts) >= 2:
+                        rows.append((req_type, req['name'], course, parts[0], parts[1]))
+        major_courses[major] = rows
+
 def init_rag_pipeline():
     """Initialize the RAG pipeline for schedule generation"""
     global rag_pipeline
@@ -580,17 +817,55 @@ def init_rag_pipeline():
 
 def get_course_info(subject, course_number):
     """Get course information from the dataset"""
-    if courses_df is None:
-        return None
+    return course_index.get((subject, str(course_number)))
 
-    course = courses_df[
-        (courses_df['Subject'] == subject) &
-        (courses_df['Course Number'] == str(course_number))
-    ]
+class UncachedResult(Exception):
+    """Carries a result out of an lru_cache'd call so it is returned but not memoized"""
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+def call_cached(func, *args):
+    """Call a memoized function, returning results it marks as uncacheable without storing them"""
+    try:
+        return func(*args)
+    except UncachedResult as e:
+        return e.result
+
+@lru_cache(maxsize=AI_CACHE_SIZE)
+def cached_rag_schedule(major, graduation_year, graduation_semester, current_year, completed_courses):
+    """Generate a RAG schedule, memoized on the canonicalized request inputs"""
+    from rag_pipeline import FALLBACK_SCHEDULE_NOTE
+
+    # preferences is deliberately not passed: generate_schedule accepts it but never
+    # reads it, and the completed courses and current year it does use are in the key
+    plan = rag_pipeline.generate_schedule(
+        major=major,
+        graduation_year=graduation_year,
+        graduation_semester=graduation_semester,
+        current_year=current_year,
+        completed_courses=list(completed_courses)
+    )
+    # The pipeline swallows LLM errors and returns an empty plan; don't pin that to the key
+    if plan.get('ai_recommendations') == FALLBACK_SCHEDULE_NOTE:
+        raise UncachedResult(plan)
+    return plan
 
-    if len(course) > 0:
-        return course.iloc[0].to_dict()
-    return None
+@lru_cache(maxsize=AI_CACHE_SIZE)
+def cached_ai_suggestions(major, term, year, current_courses_json):
+    """Get RAG course suggestions, memoized on the semester and current courses"""
+    from rag_pipeline import SUGGESTIONS_UNAVAILABLE_ADVICE, SUGGESTIONS_FAILED_ADVICE
+
+    semester = {'term': term, 'year': year}
+    suggestions = rag_pipeline.get_ai_suggestions(major, semester, orjson.loads(current_courses_json))
+    if isinstance(suggestions, dict) and suggestions.get('advice') in (SUGGESTIONS_UNAVAILABLE_ADVICE, SUGGESTIONS_FAILED_ADVICE):
+        raise UncachedResult(suggestions)
+    return suggestions
+
+def completed_courses_key(completed_courses):
+    """Canonical, hashable cache key for a client's completed course list"""
+    # Sorted as strings so sloppy mixed-type input (e.g. a bare number) can't raise TypeError
+    return tuple(sorted(map(str, completed_courses)))
 
 def generate_four_year_plan(major, graduation_year, preferences=None, graduation_semester='Spring'):
     """Generate a four-year plan using RAG pipeline"""
@@ -603,16 +878,17 @@ def generate_four_year_plan(major, graduation_year, preferences=None, graduation
             completed_courses = preferences.get('completed_courses', [])
             current_year = preferences.get('current_year', graduation_year - 4)
 
-            # Use RAG pipeline for generation
-            plan = rag_pipeline.generate_schedule(
-                major=major,
-                graduation_year=graduation_year,
-                graduation_semester=graduation_semester,
-                current_year=current_year,
-                completed_courses=completed_courses,
-                preferences=preferences
+            # Use RAG pipeline for generation; identical requests are served from cache
+            plan = call_cached(
+                cached_rag_schedule,
+                major,
+                graduation_year,
+                graduation_semester,
+                current_year,
+                completed_courses_key(completed_courses)
             )
-            return plan
+            # Hand out a copy so callers can't mutate the cached plan
+            return copy.deepcopy(plan)
         except Exception as e:
             logger.error(f"RAG pipeline error: {e}")
             # Fall back to basic generation
@@ -622,16 +898,31 @@ def generate_four_year_plan(major, graduation_year, preferences=None, graduation
 
 def generate_basic_four_year_plan(major, graduation_year, preferences=None, graduation_semester='Spring'):
     """Generate a basic four-year plan (fallback method)"""
+    # Get completed courses from preferences
+    preferences = preferences or {}
+    completed_courses = preferences.get('completed_courses', [])
+    current_year = preferences.get('current_year', graduation_year - 4)
+
+    plan = call_cached(
+        cached_basic_plan,
+        major,
+        graduation_year,
+        graduation_semester,
+        current_year,
+        completed_courses_key(completed_courses),
+        catalog_generation
+    )
+    # Hand out a copy so callers can't mutate the cached plan
+    return copy.deepcopy(plan)
+
+@lru_cache(maxsize=AI_CACHE_SIZE)
+def cached_basic_plan(major, graduation_year, graduation_semester, current_year, completed_courses, generation):
+    """Build a basic plan, memoized per catalog generation"""
     if major not in majors_data:
         return None
 
     major_info = majors_data[major]
-    start_year = graduation_year - 4
-
-    # Get completed courses from preferences
-    preferences = preferences or {}
-    completed_courses = set(preferences.get('completed_courses', []))
-    current_year = preferences.get('current_year', start_year)
+    completed_courses = frozenset(completed_courses)
 
     # Create semesters from current year to graduation
     semesters = []
@@ -670,31 +961,33 @@ def generate_basic_four_year_plan(major, graduation_year, preferences=None, grad
 
     # Add courses to semesters (simplified distribution)
     semester_idx = 0
-    for req_type, requirements in major_info['requirements'].items():
-        for req in requirements:
-            for course in req['courses']:
-                if course in completed_courses:
-                    continue  # Skip completed courses
+    for req_type, req_name, course, subject, number in major_courses[major]:
+        if course in completed_courses:
+            continue  # Skip completed courses
+
+        if semester_idx >= len(semesters):
+            break
+
+        course_info = get_course_info(subject, number)
+        if course_info:
+            units = int(course_info.get('Credits - Units - Minimum Units', 4))
+            semesters[semester_idx]['courses'].append({
+                'subject': course_info['Subject'],
+                'number': str(course_info['Course Number']),
+                'title': course_info['Course Description'],
+                'units': units,
+                'requirement_type': req_type,
+                'requirement_name': req_name
+            })
+            semesters[semester_idx]['units'] += units
 
-                if semester_idx < len(semesters):
-                    parts = course.split()
-                    if len(parts) >= 2:
-                        course_info = get_course_info(parts[0], parts[1])
-                        if course_info:
-                            semesters[semester_idx]['courses'].append({
-                                'subject': course_info['Subject'],
-                                'number': str(course_info['Course Number']),
-                                'title': course_info['Course Description'],
-                                'units': int(course_info.get('Credits - Units - Minimum Units', 4)),
-                                'requirement_type': req_type,
-                                'requirement_name': req['name']
-                            })
-                            semesters[semester_idx]['units'] += int(course_info.get('Credits - Units - Minimum Units', 4))
-
-                            # Move to next semester if current has 16+ units
-                            if semesters[semester_idx]['units'] >= 16:
-                                semester_idx += 1
+            # Move to next semester if current has 16+ units
+            if semesters[semester_idx]['units'] >= 16:
+                semester_idx += 1
 
+    # A reload during the build may have mixed old and new course details
+    if generation != catalog_generation:
+        raise UncachedResult(plan)
     return plan
 
 # ---------------------- HEALTH CHECK ----------------------
@@ -724,8 +1017,8 @@ def signup():
     if len(password) < 6:
         return jsonify({"error": "Password must be at least 6 characters"}), 400
 
-    password_hash = generate_password_hash(password)
-    now = datetime.now(timezone.utc).isoformat()
+    password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+    now = datetime.now(timezone.utc)
 
     try:
         result = db.users.insert_one({
@@ -796,12 +1089,17 @@ def schedules():
 
     if request.method == 'GET':
         try:
-            rows = list(db.schedules.find({'user_id': user_id}).sort('updated_at', -1))
+            # Plan data dominates document size; the list only carries it on request
+            include_data = request.args.get('include') == 'data'
+            projection = {'name': 1, 'created_at': 1, 'updated_at': 1}
+            if include_data:
+                projection['data'] = 1
+            rows = list(db.schedules.find({'user_id': user_id}, projection).sort('updated_at', -1))
             return jsonify([
                 {
                     "id": str(r['_id']),
                     "name": r['name'],
-                    "data": r['data'],
+                    **({"data": r['data']} if include_data else {}),
                     "created_at": r['created_at'],
                     "updated_at": r['updated_at']
                 }
@@ -819,7 +1117,7 @@ def schedules():
             if not data:
                 return jsonify({"error": "Missing schedule data"}), 400
 
-            now = datetime.now(timezone.utc).isoformat()
+            now = datetime.now(timezone.utc)
             result = db.schedules.insert_one({
                 'user_id': user_id,
                 'name': name,
@@ -842,10 +1140,9 @@ def schedule_detail(schedule_id: str):
 
     user_id = session['user_id']
 
-    try:
-        oid = ObjectId(schedule_id)
-    except Exception:
+    if not ObjectId.is_valid(schedule_id):
         return jsonify({"error": "Invalid id"}), 400
+    oid = ObjectId(schedule_id)
 
     if request.method == 'GET':
         try:
@@ -868,7 +1165,7 @@ def schedule_detail(schedule_id: str):
             body = request.get_json() or {}
             name = (body.get('name') or '').strip()
             data = body.get('data')
-            now = datetime.now(timezone.utc).isoformat()
+            now = datetime.now(timezone.utc)
 
             update = {'updated_at': now}
             if name:
@@ -901,18 +1198,27 @@ def schedule_detail(schedule_id: str):
             return jsonify({"error": "Failed to delete schedule"}), 500
 
 # ---------------------- MAJORS ENDPOINTS ----------------------
+def static_json_response(body, etag):
+    """Serve precomputed JSON with an ETag, replying 304 when the client copy is current"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
 @app.route('/api/majors', methods=['GET'])
 def get_majors():
     """Get list of available majors"""
-    return jsonify(list(majors_data.keys()))
+    return static_json_response(majors_list_json, majors_list_etag)
 
 @app.route('/api/major/<major_name>', methods=['GET'])
 def get_major_details(major_name):
     """Get details for a specific major"""
-    if major_name not in majors_data:
+    if major_name not in major_details_json:
         return jsonify({"error": "Major not found"}), 404
 
-    return jsonify(majors_data[major_name])
+    body, etag = major_details_json[major_name]
+    return static_json_response(body, etag)
 
 # ---------------------- PLAN GENERATION ----------------------
 @app.route('/api/generate-plan', methods=['POST'])
@@ -946,6 +1252,39 @@ def generate_plan():
         logger.error(f"Error generating plan: {e}", exc_info=True)
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+@lru_cache(maxsize=AI_CACHE_SIZE)
+def cached_course_options(major, requirement_type, requirement_name, generation):
+    """Resolve a requirement's courses, memoized per catalog generation"""
+    # Find the specific requirement
+    requirement = None
+    for req in majors_data[major]['requirements'][requirement_type]:
+        if req['name'] == requirement_name:
+            requirement = req
+            break
+
+    if not requirement:
+        return None
+
+    # Get alternative courses that could fulfill this requirement
+    options = []
+    for course in requirement['courses']:
+        parts = course.split()
+        if len(parts) >= 2:
+            course_info = get_course_info(parts[0], parts[1])
+            if course_info:
+                options.append({
+                    'subject': course_info['Subject'],
+                    'number': str(course_info['Course Number']),
+                    'title': course_info['Course Description'],
+                    'units': int(course_info.get('Credits - Units - Minimum Units', 4)),
+                    'terms_offered': course_info.get('Terms Offered', 'Fall, Spring'),
+                    'department': course_info.get('Department(s)', '')
+                })
+    # A reload during the build may have mixed old and new course details
+    if generation != catalog_generation:
+        raise UncachedResult(options)
+    return options
+
 # ---------------------- COURSE OPTIONS ----------------------
 @app.route('/api/course-options', methods=['POST'])
 def get_course_options():
@@ -962,36 +1301,13 @@ def get_course_options():
         if major not in majors_data:
             return jsonify({"error": "Major not found"}), 404
 
-        major_info = majors_data[major]
-        if requirement_type not in major_info['requirements']:
+        if requirement_type not in majors_data[major]['requirements']:
             return jsonify({"error": "Requirement type not found"}), 404
 
-        # Find the specific requirement
-        requirement = None
-        for req in major_info['requirements'][requirement_type]:
-            if req['name'] == requirement_name:
-                requirement = req
-                break
-
-        if not requirement:
+        options = call_cached(cached_course_options, major, requirement_type, requirement_name, catalog_generation)
+        if options is None:
             return jsonify({"error": "Requirement not found"}), 404
 
-        # Get alternative courses that could fulfill this requirement
-        options = []
-        for course in requirement['courses']:
-            parts = course.split()
-            if len(parts) >= 2:
-                course_info = get_course_info(parts[0], parts[1])
-                if course_info:
-                    options.append({
-                        'subject': course_info['Subject'],
-                        'number': str(course_info['Course Number']),
-                        'title': course_info['Course Description'],
-                        'units': int(course_info.get('Credits - Units - Minimum Units', 4)),
-                        'terms_offered': course_info.get('Terms Offered', 'Fall, Spring'),
-                        'department': course_info.get('Department(s)', '')
-                    })
-
         return jsonify({
             'requirement_name': requirement_name,
             'requirement_type': requirement_type,
@@ -1016,35 +1332,45 @@ def search_courses():
         # Try RAG-based search first
         if rag_pipeline is not None:
             try:
-                results = rag_pipeline.search_courses(query, limit=10)
+                results = rag_pipeline.search_courses(query, limit=SEARCH_LIMIT)
                 if results:
                     return jsonify({"courses": results})
             except Exception as e:
                 logger.warning(f"RAG search failed, falling back to basic: {e}")
 
         # Fallback to basic search
-        if courses_df is None:
+        if course_search_df is None:
             return jsonify({"courses": []})
 
-        matching_courses = []
-        for _, course in courses_df.iterrows():
-            course_code = f"{course['Subject']} {course['Course Number']}"
-            course_title = str(course['Course Description'])
-
-            if (query in course_code or
-                query in course_title.upper() or
-                course_code.startswith(query)):
-
-                matching_courses.append({
-                    'code': course_code,
-                    'title': course_title,
-                    'units': int(course.get('Credits - Units - Minimum Units', 4)),
-                    'terms': course.get('Terms Offered', 'Fall, Spring')
-                })
-
-                if len(matching_courses) >= 10:
+        # Vectorized substring match over the precomputed columns, one chunk at a
+        # time so common queries stop scanning once enough matches are found
+        matches = []
+        found = 0
+        for start in range(0, len(course_search_df), SEARCH_CHUNK_SIZE):
+            chunk = course_search_df.iloc[start:start + SEARCH_CHUNK_SIZE]
+            mask = (
+                chunk['code_upper'].str.contains(query, regex=False) |
+                chunk['title_upper'].str.contains(query, regex=False)
+            )
+            hits = chunk[mask]
+            if len(hits):
+                matches.append(hits)
+                found += len(hits)
+                if found >= SEARCH_LIMIT:
                     break
 
+        matching_courses = []
+        if matches:
+            matching_courses = [
+                {
+                    'code': course['code'],
+                    'title': course['title'],
+                    'units': int(course['units']),
+                    'terms': course['terms']
+                }
+                for course in pd.concat(matches).head(SEARCH_LIMIT).to_dict('records')
+            ]
+
         return jsonify({"courses": matching_courses})
 
     except Exception as e:
@@ -1067,7 +1393,13 @@ def get_ai_suggestions():
         # Use RAG pipeline for suggestions
         if rag_pipeline is not None:
             try:
-                suggestions = rag_pipeline.get_ai_suggestions(major, semester, current_courses)
+                suggestions = call_cached(
+                    cached_ai_suggestions,
+                    major,
+                    semester.get('term', 'Fall'),
+                    semester.get('year', 2024),
+                    orjson.dumps(current_courses, option=orjson.OPT_SORT_KEYS)
+                )
                 return jsonify(suggestions)
             except Exception as e:
                 logger.error(f"RAG suggestions failed: {e}")
@@ -1088,6 +1420,7 @@ init_db()
 load_course_data()
 load_majors_data()
 init_rag_pipeline()
+start_course_data_watcher()
 logger.info("Berkeley Four Year Plan Generator API initialized")
 
 # ---------------------- MAIN ----------------------
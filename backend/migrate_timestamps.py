@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+One-off migration: convert timestamps stored as ISO strings by older
+versions of the app to BSON dates. Safe to re-run; only string values
+are touched.
+
+Usage: python migrate_timestamps.py  (reads MONGODB_URI / MONGO_DB_NAME)
+"""
+
+import os
+import logging
+from datetime import datetime
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'berkeley_planner')
+
+# Timestamp fields written as strings before dates were stored natively
+TIMESTAMP_FIELDS = {
+    'users': ['created_at'],
+    'schedules': ['created_at', 'updated_at'],
+}
+
+def migrate_collection(collection, field):
+    """Convert one field's string values to dates, skipping values that don't parse"""
+    updates = []
+    for doc in collection.find({field: {'$type': 'string'}}, {field: 1}):
+        try:
+            value = datetime.fromisoformat(doc[field])
+        except ValueError:
+            logger.warning(f"Skipping {collection.name} {doc['_id']}: unparseable {field} {doc[field]!r}")
+            continue
+        updates.append(UpdateOne({'_id': doc['_id']}, {'$set': {field: value}}))
+
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+    logger.info(f"Converted {len(updates)} {collection.name}.{field} values to dates")
+
+def main():
+    client = MongoClient(MONGODB_URI, tz_aware=True)
+    db = client[MONGO_DB_NAME]
+    for name, fields in TIMESTAMP_FIELDS.items():
+        for field in fields:
+            migrate_collection(db[name], field)
+
+if __name__ == "__main__":
+    main()
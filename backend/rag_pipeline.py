@@ -4,8 +4,12 @@ Uses LangChain with Google Gemini for intelligent schedule generation
 """
 
 import os
-import json
+import re
+import hashlib
+import shutil
 import logging
+from functools import lru_cache
+import orjson
 import pandas as pd
 from typing import List, Dict, Any, Optional
 
@@ -20,6 +24,137 @@ from langchain_core.output_parsers import StrOutputParser
 
 logger = logging.getLogger(__name__)
 
+# Outermost {...} block of an LLM response; surrounding prose or code fences are ignored
+JSON_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
+# Embedding model used for the vector store; part of the persisted store's key.
+# potion-base-8M is a static (Model2Vec) distillation, so CPU encoding is a
+# token lookup and mean rather than a transformer forward pass.
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'minishlab/potion-base-8M')
+# Set to 'onnx' to run a transformer model (e.g. all-MiniLM-L6-v2) through
+# onnxruntime with the int8 dynamically quantized export from its model repo;
+# requires sentence-transformers[onnx]
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+EMBEDDING_ONNX_FILE = os.getenv('EMBEDDING_ONNX_FILE', 'onnx/model_qint8_avx512_vnni.onnx')
+# Optional torch dtype for transformer models on the torch backend, e.g. 'bfloat16'
+# on CPUs with AVX-512 BF16/AMX; empty keeps float32
+EMBEDDING_TORCH_DTYPE = os.getenv('EMBEDDING_TORCH_DTYPE', '')
+
+# Vector stores are persisted here, one directory per catalog/majors signature
+CHROMA_CACHE_DIR = os.getenv('CHROMA_CACHE_DIR', '.chroma_cache')
+# Written into a store's directory once every document is embedded; directories
+# without it are partial builds and are discarded
+CHROMA_COMPLETE_MARKER = '.complete'
+# Bump whenever the document text or metadata change so stored embeddings are rebuilt
+DOCUMENT_FORMAT_VERSION = 1
+
+# Documents retrieved as context for each LLM prompt, picked by maximal marginal
+# relevance from the nearest RETRIEVAL_FETCH_K so near-duplicates don't crowd the prompt
+RETRIEVAL_K = 10
+RETRIEVAL_FETCH_K = 30
+RETRIEVAL_LAMBDA = 0.5
+# Distinct query strings whose embeddings are kept per pipeline
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+# Distinct queries whose formatted prompt context is kept per pipeline
+QUERY_CONTEXT_CACHE_SIZE = 1024
+
+# Messages returned in place of an LLM answer; callers that cache results match
+# on these so a transient failure isn't memoized
+FALLBACK_SCHEDULE_NOTE = 'Basic plan generated. For personalized recommendations, please ensure the RAG system is properly configured.'
+SUGGESTIONS_UNAVAILABLE_ADVICE = "AI suggestions unavailable. Please ensure the system is properly configured."
+SUGGESTIONS_FAILED_ADVICE = "Unable to generate suggestions at this time. Please try again later."
+
+# Text embedded for each course; filled with str.format per row
+COURSE_DOCUMENT_TEMPLATE = """Course: {course_code}
+Title: {description}
+Department: {department}
+Units: {units_min}-{units_max} if {units_min} != {units_max} else {units_min}
+Terms Offered: {terms}
+Description: {description}"""
+
+# Prompts are parsed once at import and reused for every request
+SCHEDULE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert UC Berkeley academic advisor. Your task is to create a comprehensive,
+realistic 4-year academic plan based on the provided course catalog and major requirements.
+
+IMPORTANT RULES:
+1. Only include courses that exist in the provided course catalog
+2. Respect prerequisites and course sequences
+3. Balance course load across semesters (12-16 units per semester)
+4. Consider term availability for courses
+5. Include breadth/general education requirements
+6. Do NOT include courses the student has already completed
+7. Ensure courses are properly sequenced (lower division before upper division)
+
+CONTEXT FROM COURSE CATALOG AND REQUIREMENTS:
+{context}"""),
+    ("human", """Create a 4-year academic plan for:
+- Major: {major}
+- Target Graduation: {graduation_semester} {graduation_year}
+- Current Year: {current_year}
+- Completed Courses: {completed_courses}
+
+Generate a complete semester-by-semester plan from {current_year} to {graduation_semester} {graduation_year}.
+
+Return ONLY valid JSON in exactly this format (no markdown, no explanation):
+{{
+    "major": "{major}",
+    "college": "College Name",
+    "graduation_year": {graduation_year},
+    "graduation_semester": "{graduation_semester}",
+    "total_units": 120,
+    "semesters": [
+        {{
+            "year": 2024,
+            "term": "Fall",
+            "courses": [
+                {{
+                    "subject": "SUBJECT",
+                    "number": "101",
+                    "title": "Course Title",
+                    "units": 4,
+                    "requirement_type": "lower_division|upper_division|breadth",
+                    "requirement_name": "Requirement Category"
+                }}
+            ],
+            "units": 16
+        }}
+    ],
+    "ai_recommendations": "Personalized advice and tips for academic success"
+}}""")
+])
+
+SUGGESTIONS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a UC Berkeley academic advisor. Suggest additional courses
+based on the provided course catalog and the student's current course selection.
+
+CONTEXT FROM COURSE CATALOG:
+{context}"""),
+    ("human", """For a {major} major in {term} {year}, with current courses:
+{current_courses}
+
+Suggest 3-5 additional courses. Consider:
+1. Prerequisites and course sequences
+2. Workload balance (aim for 12-16 units total)
+3. Course availability in {term}
+4. Breadth requirements
+5. Major requirements
+
+Return ONLY valid JSON:
+{{
+    "suggestions": [
+        {{
+            "subject": "SUBJECT",
+            "number": "123",
+            "title": "Course Title",
+            "units": 4,
+            "reason": "Why this course is recommended"
+        }}
+    ],
+    "advice": "General academic advice for this semester"
+}}""")
+])
+
 
 class BerkeleyRAGPipeline:
     """RAG Pipeline for generating Berkeley course schedules"""
@@ -45,17 +180,28 @@ class BerkeleyRAGPipeline:
             convert_system_message_to_human=True
         )
 
+        # Prompt -> LLM -> text chains are composed once and reused for every request
+        self.schedule_chain = SCHEDULE_PROMPT | self.llm | StrOutputParser()
+        self.suggestions_chain = SUGGESTIONS_PROMPT | self.llm | StrOutputParser()
+
         # Initialize embeddings using HuggingFace (local, no API limits)
-        # Using all-MiniLM-L6-v2 - fast and good quality for semantic search
+        model_kwargs = {'device': 'cpu'}
+        if EMBEDDING_BACKEND == 'onnx':
+            model_kwargs.update(backend='onnx', model_kwargs={'file_name': EMBEDDING_ONNX_FILE})
+        elif EMBEDDING_TORCH_DTYPE:
+            model_kwargs.update(model_kwargs={'torch_dtype': EMBEDDING_TORCH_DTYPE})
         self.embeddings = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
+            model_name=EMBEDDING_MODEL,
+            model_kwargs=model_kwargs,
             encode_kwargs={'normalize_embeddings': True}
         )
+        # Plan and suggestion queries repeat across students, so their embeddings are reused
+        self._embed_query = lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(self.embeddings.embed_query)
+        # The vector store is fixed for the pipeline's lifetime, so a query always yields the same context
+        self._context_for = lru_cache(maxsize=QUERY_CONTEXT_CACHE_SIZE)(self._retrieve_context)
 
         # Initialize vector store
         self.vectorstore = None
-        self.retriever = None
 
         # Build the vector store
         self._build_vectorstore()
@@ -70,26 +216,47 @@ class BerkeleyRAGPipeline:
             logger.warning("No course data available")
             return documents
 
-        for _, course in self.courses_df.iterrows():
-            # Create a rich text representation of the course
-            subject = str(course.get('Subject', '')).strip()
-            number = str(course.get('Course Number', '')).strip()
-            description = str(course.get('Course Description', '')).strip()
-            department = str(course.get('Department(s)', '')).strip()
-            units_min = course.get('Credits - Units - Minimum Units', 0)
-            units_max = course.get('Credits - Units - Maximum Units', units_min)
-            terms = str(course.get('Terms Offered', 'Fall, Spring')).strip()
-
+        df = self.courses_df
+
+        def text_column(name, default=''):
+            values = df[name].tolist() if name in df else [default] * len(df)
+            return [str(value).strip() for value in values]
+
+        # Pull each column out once, then build documents from plain Python values
+        subjects = text_column('Subject')
+        numbers = text_column('Course Number')
+        descriptions = text_column('Course Description')
+        departments = text_column('Department(s)')
+        terms = [
+            term if term and term != '-' else 'Fall, Spring'
+            for term in text_column('Terms Offered', 'Fall, Spring')
+        ]
+
+        # Unit counts are converted for the metadata in one vectorized pass
+        units_min = df.get('Credits - Units - Minimum Units', pd.Series(0, index=df.index))
+        units_max = df.get('Credits - Units - Maximum Units', units_min)
+        metadata_min = pd.to_numeric(units_min, errors='coerce')
+        metadata_max = pd.to_numeric(units_max, errors='coerce').fillna(metadata_min).fillna(0).astype(int)
+        metadata_min = metadata_min.fillna(0).astype(int)
+
+        rows = zip(
+            subjects, numbers, descriptions, departments,
+            units_min.tolist(), units_max.tolist(), terms,
+            metadata_min.tolist(), metadata_max.tolist()
+        )
+        for subject, number, description, department, umin, umax, term, meta_min, meta_max in rows:
             # Create course code
             course_code = f"{subject} {number}"
 
             # Create document content
-            content = f"""Course: {course_code}
-Title: {description}
-Department: {department}
-Units: {units_min}-{units_max} if {units_min} != {units_max} else {units_min}
-Terms Offered: {terms if terms and terms != '-' else 'Fall, Spring'}
-Description: {description}"""
+            content = COURSE_DOCUMENT_TEMPLATE.format(
+                course_code=course_code,
+                description=description,
+                department=department,
+                units_min=umin,
+                units_max=umax,
+                terms=term
+            )
 
             # Create metadata for filtering
             metadata = {
@@ -97,9 +264,9 @@ Description: {description}"""
                 'number': number,
                 'course_code': course_code,
                 'department': department,
-                'units_min': int(units_min) if pd.notna(units_min) else 0,
-                'units_max': int(units_max) if pd.notna(units_max) else int(units_min) if pd.notna(units_min) else 0,
-                'terms': terms if terms and terms != '-' else 'Fall, Spring'
+                'units_min': meta_min,
+                'units_max': meta_max,
+                'terms': term
             }
 
             documents.append(Document(page_content=content, metadata=metadata))
@@ -116,21 +283,22 @@ Description: {description}"""
             total_units = major_info.get('total_units', 120)
             requirements = major_info.get('requirements', {})
 
-            # Create document content for the major
-            content = f"""Major: {major_name}
+            # Create document content for the major; pieces are joined once at the end
+            parts = [f"""Major: {major_name}
 College: {college}
 Total Units Required: {total_units}
 
 Requirements:
-"""
+"""]
             for req_type, reqs in requirements.items():
-                content += f"\n{req_type.replace('_', ' ').title()}:\n"
+                parts.append(f"\n{req_type.replace('_', ' ').title()}:\n")
                 for req in reqs:
                     req_name = req.get('name', '')
                     req_courses = req.get('courses', [])
                     req_units = req.get('units', 0)
                     req_desc = req.get('description', '')
-                    content += f"  - {req_name}: {', '.join(req_courses)} ({req_units} units) - {req_desc}\n"
+                    parts.append(f"  - {req_name}: {', '.join(req_courses)} ({req_units} units) - {req_desc}\n")
+            content = ''.join(parts)
 
             metadata = {
                 'major': major_name,
@@ -144,37 +312,103 @@ Requirements:
         logger.info(f"Created {len(documents)} major requirement documents")
         return documents
 
+    def _data_signature(self) -> str:
+        """Hash the document format, course catalog, majors and embedding model that feed the vector store"""
+        embedding_variant = EMBEDDING_ONNX_FILE if EMBEDDING_BACKEND == 'onnx' else EMBEDDING_TORCH_DTYPE
+        embedding_key = f"{DOCUMENT_FORMAT_VERSION}|{EMBEDDING_MODEL}|{EMBEDDING_BACKEND}|{embedding_variant}"
+        digest = hashlib.blake2b(embedding_key.encode(), digest_size=8)
+        if self.courses_df is not None:
+            digest.update(pd.util.hash_pandas_object(self.courses_df, index=False).values.tobytes())
+        digest.update(orjson.dumps(self.majors_data, option=orjson.OPT_SORT_KEYS))
+        return digest.hexdigest()
+
     def _build_vectorstore(self):
         """Build the vector store from course and major documents"""
         try:
-            # Create documents
-            course_docs = self._create_course_documents()
-            major_docs = self._create_major_documents()
-            all_docs = course_docs + major_docs
-
-            if not all_docs:
-                logger.warning("No documents to index")
-                return
-
-            # Create vector store
-            self.vectorstore = Chroma.from_documents(
-                documents=all_docs,
-                embedding=self.embeddings,
-                collection_name="berkeley_courses"
-            )
-
-            # Create retriever with search parameters
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 20}  # Retrieve top 20 relevant documents
-            )
-
-            logger.info(f"Built vector store with {len(all_docs)} documents")
+            signature = self._data_signature()
+            persist_directory = os.path.join(CHROMA_CACHE_DIR, signature)
+            complete_marker = os.path.join(persist_directory, CHROMA_COMPLETE_MARKER)
+
+            # Reuse the embeddings from a previous run over the same data
+            if os.path.isfile(complete_marker):
+                try:
+                    self.vectorstore = Chroma(
+                        collection_name="berkeley_courses",
+                        embedding_function=self.embeddings,
+                        persist_directory=persist_directory
+                    )
+                    logger.info(f"Loaded vector store from {persist_directory}")
+                except Exception as e:
+                    logger.warning(f"Could not load cached vector store, rebuilding: {e}")
+                    self.vectorstore = None
+
+            if self.vectorstore is None:
+                # Create documents
+                course_docs = self._create_course_documents()
+                major_docs = self._create_major_documents()
+                all_docs = course_docs + major_docs
+
+                if not all_docs:
+                    logger.warning("No documents to index")
+                    return
+
+                # Start from an empty directory; anything there is a failed or interrupted build
+                if os.path.isdir(persist_directory):
+                    logger.warning(f"Discarding incomplete vector store in {persist_directory}")
+                    shutil.rmtree(persist_directory)
+
+                # Create vector store
+                try:
+                    self.vectorstore = Chroma.from_documents(
+                        documents=all_docs,
+                        embedding=self.embeddings,
+                        collection_name="berkeley_courses",
+                        persist_directory=persist_directory
+                    )
+                except Exception:
+                    shutil.rmtree(persist_directory, ignore_errors=True)
+                    raise
+
+                # Only a fully embedded store is marked reusable
+                with open(complete_marker, 'w'):
+                    pass
+
+                logger.info(f"Built vector store with {len(all_docs)} documents")
+
+            self._prune_vectorstores(signature)
 
         except Exception as e:
             logger.error(f"Error building vector store: {e}")
             raise
 
+    def _prune_vectorstores(self, signature: str):
+        """Delete stores persisted for older catalogs, majors or embedding settings"""
+        for name in os.listdir(CHROMA_CACHE_DIR):
+            path = os.path.join(CHROMA_CACHE_DIR, name)
+            if name != signature and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed stale vector store {path}")
+
+    def _extract_json(self, response: str) -> Dict[str, Any]:
+        """Extract and parse the JSON object embedded in an LLM response"""
+        match = JSON_OBJECT_PATTERN.search(response)
+        if match is None:
+            raise ValueError("No JSON found in response")
+        return orjson.loads(match.group(0))
+
+    def _retrieve(self, query: str) -> List[Document]:
+        """Retrieve diverse prompt context using the cached embedding of the query"""
+        return self.vectorstore.max_marginal_relevance_search_by_vector(
+            self._embed_query(query),
+            k=RETRIEVAL_K,
+            fetch_k=RETRIEVAL_FETCH_K,
+            lambda_mult=RETRIEVAL_LAMBDA
+        )
+
+    def _retrieve_context(self, query: str) -> str:
+        """Retrieve and format the prompt context for a query"""
+        return self._format_docs(self._retrieve(query))
+
     def _format_docs(self, docs: List[Document]) -> str:
         """Format retrieved documents for the prompt"""
         return "\n\n---\n\n".join([doc.page_content for doc in docs])
@@ -202,7 +436,7 @@ Requirements:
         Returns:
             Dictionary containing the generated schedule
         """
-        if self.retriever is None:
+        if self.vectorstore is None:
             logger.error("Vector store not initialized")
             return self._fallback_schedule(major, graduation_year, graduation_semester)
 
@@ -217,79 +451,18 @@ Requirements:
 
         try:
             # Retrieve relevant documents
-            retrieved_docs = self.retriever.invoke(query)
-            context = self._format_docs(retrieved_docs)
-
-            # Create the prompt template
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert UC Berkeley academic advisor. Your task is to create a comprehensive,
-realistic 4-year academic plan based on the provided course catalog and major requirements.
-
-IMPORTANT RULES:
-1. Only include courses that exist in the provided course catalog
-2. Respect prerequisites and course sequences
-3. Balance course load across semesters (12-16 units per semester)
-4. Consider term availability for courses
-5. Include breadth/general education requirements
-6. Do NOT include courses the student has already completed
-7. Ensure courses are properly sequenced (lower division before upper division)
-
-CONTEXT FROM COURSE CATALOG AND REQUIREMENTS:
-{context}"""),
-                ("human", """Create a 4-year academic plan for:
-- Major: {major}
-- Target Graduation: {graduation_semester} {graduation_year}
-- Current Year: {current_year}
-- Completed Courses: {completed_courses}
-
-Generate a complete semester-by-semester plan from {current_year} to {graduation_semester} {graduation_year}.
-
-Return ONLY valid JSON in exactly this format (no markdown, no explanation):
-{{
-    "major": "{major}",
-    "college": "College Name",
-    "graduation_year": {graduation_year},
-    "graduation_semester": "{graduation_semester}",
-    "total_units": 120,
-    "semesters": [
-        {{
-            "year": 2024,
-            "term": "Fall",
-            "courses": [
-                {{
-                    "subject": "SUBJECT",
-                    "number": "101",
-                    "title": "Course Title",
-                    "units": 4,
-                    "requirement_type": "lower_division|upper_division|breadth",
-                    "requirement_name": "Requirement Category"
-                }}
-            ],
-            "units": 16
-        }}
-    ],
-    "ai_recommendations": "Personalized advice and tips for academic success"
-}}""")
-            ])
-
-            # Build the chain
-            chain = (
-                {
-                    "context": lambda x: context,
-                    "major": lambda x: major,
-                    "graduation_semester": lambda x: graduation_semester,
-                    "graduation_year": lambda x: graduation_year,
-                    "current_year": lambda x: current_year,
-                    "completed_courses": lambda x: ", ".join(completed_courses) if completed_courses else "None"
-                }
-                | prompt_template
-                | self.llm
-                | StrOutputParser()
-            )
+            context = self._context_for(query)
 
             # Generate the response
             logger.info(f"Generating RAG-based schedule for {major}")
-            response = chain.invoke({})
+            response = self.schedule_chain.invoke({
+                "context": context,
+                "major": major,
+                "graduation_semester": graduation_semester,
+                "graduation_year": graduation_year,
+                "current_year": current_year,
+                "completed_courses": ", ".join(completed_courses) if completed_courses else "None"
+            })
 
             # Parse the JSON response
             schedule = self._parse_schedule_response(response, major, graduation_year, graduation_semester)
@@ -310,25 +483,7 @@ Return ONLY valid JSON in exactly this format (no markdown, no explanation):
     ) -> Dict[str, Any]:
         """Parse the LLM response into a schedule dictionary"""
         try:
-            # Clean up the response - remove markdown code blocks if present
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
-
-            # Find JSON boundaries
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON found in response")
-
-            json_str = response[start_idx:end_idx]
-            schedule = json.loads(json_str)
+            schedule = self._extract_json(response)
 
             # Validate required fields
             required_fields = ['major', 'semesters']
@@ -338,7 +493,7 @@ Return ONLY valid JSON in exactly this format (no markdown, no explanation):
 
             return schedule
 
-        except (json.JSONDecodeError, ValueError) as e:
+        except ValueError as e:
             logger.error(f"Error parsing schedule response: {e}")
             logger.debug(f"Response was: {response[:500]}...")
             return self._fallback_schedule(major, graduation_year, graduation_semester)
@@ -359,27 +514,14 @@ Return ONLY valid JSON in exactly this format (no markdown, no explanation):
             'requirements': {}
         })
 
-        semesters = []
-        for year in range(start_year, graduation_year):
-            for term in ['Fall', 'Spring']:
-                # Skip semesters after graduation
-                if year == graduation_year - 1 and term == 'Spring' and graduation_semester == 'Fall':
-                    continue
-                if year == graduation_year and term == 'Fall' and graduation_semester == 'Spring':
-                    semesters.append({
-                        'year': year,
-                        'term': term,
-                        'courses': [],
-                        'units': 0
-                    })
-                    break
-
-                semesters.append({
-                    'year': year,
-                    'term': term,
-                    'courses': [],
-                    'units': 0
-                })
+        # Fall and Spring of each year before graduation_year; a Fall graduation
+        # drops the final Spring
+        semesters = [
+            {'year': year, 'term': term, 'courses': [], 'units': 0}
+            for year in range(start_year, graduation_year)
+            for term in ('Fall', 'Spring')
+            if not (year == graduation_year - 1 and term == 'Spring' and graduation_semester == 'Fall')
+        ]
 
         return {
             'major': major,
@@ -388,7 +530,7 @@ Return ONLY valid JSON in exactly this format (no markdown, no explanation):
             'graduation_semester': graduation_semester,
             'total_units': major_info.get('total_units', 120),
             'semesters': semesters,
-            'ai_recommendations': 'Basic plan generated. For personalized recommendations, please ensure the RAG system is properly configured.'
+            'ai_recommendations': FALLBACK_SCHEDULE_NOTE
         }
 
     def get_ai_suggestions(
@@ -408,10 +550,10 @@ Return ONLY valid JSON in exactly this format (no markdown, no explanation):
         Returns:
             Dictionary with suggestions and advice
         """
-        if self.retriever is None:
+        if self.vectorstore is None:
             return {
                 "suggestions": [],
-                "advice": "AI suggestions unavailable. Please ensure the system is properly configured."
+                "advice": SUGGESTIONS_UNAVAILABLE_ADVICE
             }
 
         try:
@@ -421,78 +563,26 @@ Return ONLY valid JSON in exactly this format (no markdown, no explanation):
             {', '.join([f"{c.get('subject', '')} {c.get('number', '')}" for c in current_courses])}"""
 
             # Retrieve relevant courses
-            retrieved_docs = self.retriever.invoke(query)
-            context = self._format_docs(retrieved_docs)
-
-            # Create prompt
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", """You are a UC Berkeley academic advisor. Suggest additional courses
-based on the provided course catalog and the student's current course selection.
-
-CONTEXT FROM COURSE CATALOG:
-{context}"""),
-                ("human", """For a {major} major in {term} {year}, with current courses:
-{current_courses}
-
-Suggest 3-5 additional courses. Consider:
-1. Prerequisites and course sequences
-2. Workload balance (aim for 12-16 units total)
-3. Course availability in {term}
-4. Breadth requirements
-5. Major requirements
-
-Return ONLY valid JSON:
-{{
-    "suggestions": [
-        {{
-            "subject": "SUBJECT",
-            "number": "123",
-            "title": "Course Title",
-            "units": 4,
-            "reason": "Why this course is recommended"
-        }}
-    ],
-    "advice": "General academic advice for this semester"
-}}""")
-            ])
+            context = self._context_for(query)
 
             # Generate suggestions
-            chain = (
-                {
-                    "context": lambda x: context,
-                    "major": lambda x: major,
-                    "term": lambda x: semester.get('term', 'Fall'),
-                    "year": lambda x: semester.get('year', 2024),
-                    "current_courses": lambda x: json.dumps(current_courses, indent=2)
-                }
-                | prompt_template
-                | self.llm
-                | StrOutputParser()
-            )
-
-            response = chain.invoke({})
+            response = self.suggestions_chain.invoke({
+                "context": context,
+                "major": major,
+                "term": semester.get('term', 'Fall'),
+                "year": semester.get('year', 2024),
+                "current_courses": orjson.dumps(current_courses, option=orjson.OPT_INDENT_2).decode()
+            })
 
             # Parse response
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-
-            if start_idx != -1 and end_idx > 0:
-                return json.loads(response[start_idx:end_idx])
+            return self._extract_json(response)
 
         except Exception as e:
             logger.error(f"Error getting AI suggestions: {e}")
 
         return {
             "suggestions": [],
-            "advice": "Unable to generate suggestions at this time. Please try again later."
+            "advice": SUGGESTIONS_FAILED_ADVICE
         }
 
     def search_courses(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
@@ -511,7 +601,7 @@ Return ONLY valid JSON:
 
         try:
             # Search using similarity
-            results = self.vectorstore.similarity_search(query, k=limit)
+            results = self.vectorstore.similarity_search_by_vector(self._embed_query(query), k=limit)
 
             courses = []
             for doc in results:
@@ -3,6 +3,7 @@
 import { useEffect, useState } from 'react'
 import axios from 'axios'
 import { useRouter } from 'next/navigation'
+import toast from 'react-hot-toast'
 
 // Configure axios base URL for production
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || ''
@@ -51,8 +52,12 @@ export default function SchedulesPage() {
                 </div>
                 <button
                   onClick={() => {
-                    sessionStorage.setItem('fourYearPlan', JSON.stringify(s.data))
-                    router.push('/schedule')
+                    axios.get(`/api/schedules/${s.id}`).then(r => {
+                      sessionStorage.setItem('fourYearPlan', JSON.stringify(r.data.data))
+                      router.push('/schedule')
+                    }).catch((error: any) => {
+                      toast.error(error.response?.data?.error || 'Failed to load schedule')
+                    })
                   }}
                   className="px-3 py-2 rounded bg-blue-600 text-white hover:bg-blue-700"
                 >
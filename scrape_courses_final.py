@@ -5,27 +5,155 @@ Tries multiple approaches to get course data
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-from bs4 import BeautifulSoup
-import time
+from bs4 import BeautifulSoup, UnicodeDammit
+from lxml import etree, html as lxml_html
 import re
+import csv
 import json
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import logging
+import os
+from types import MappingProxyType
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Set up logging; SCRAPE_LOG_LEVEL=WARNING hides per-page progress
+logging.basicConfig(level=os.getenv('SCRAPE_LOG_LEVEL', 'INFO'), format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Pages fetched at once; the session's connection pool is larger than this
+SCRAPE_WORKERS = 8
+
+# Bodies past this size are truncated before parsing; seconds to wait on a page
+MAX_PAGE_BYTES = 2_000_000
+REQUEST_TIMEOUT = 10
+
+# Set SCRAPE_CACHE to a cache name to replay pages from SQLite during development
+SCRAPE_CACHE = os.getenv('SCRAPE_CACHE')
+SCRAPE_CACHE_EXPIRE = 86400
+
+# Common department codes
+DEPARTMENTS = [
+    'COMPSCI', 'MATH', 'PHYSICS', 'CHEM', 'BIOLOGY', 'ENGLISH', 'HISTORY',
+    'ECON', 'PSYCH', 'POLSCI', 'SOCIOL', 'ANTHRO', 'ART', 'MUSIC'
+]
+
+# Patterns are compiled once at import rather than looked up per page
+COURSE_CODE_PATTERN = re.compile(r'([A-Z]{2,})\s+(\d+[A-Z]?)')
+TITLE_PATTERN = re.compile(r'[A-Z]{2,}\s+\d+[A-Z]?\s*[-–]\s*(.+?)(?:\n|$)')
+UNITS_PATTERN = re.compile(r'(\d+(?:-\d+)?)\s*(?:units?|Units?)', re.IGNORECASE)
+PREREQUISITES_PATTERN = re.compile(r'Prerequisites?:\s*(.+?)(?:\n\n|\n[A-Z]|$)', re.IGNORECASE | re.DOTALL)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+DEPARTMENT_COURSE_PATTERNS = {dept: re.compile(rf'{dept}\s+(\d+[A-Z]?)') for dept in DEPARTMENTS}
+
+# Demonstration courses used when scraping finds too little; read-only since every scraper shares them
+SAMPLE_COURSES = tuple(map(MappingProxyType, [
+    {
+        'subject': 'COMPSCI',
+        'number': '61A',
+        'title': 'The Structure and Interpretation of Computer Programs',
+        'units': '4',
+        'description': 'Introduction to programming and computer science. Emphasis on functional programming, data abstraction, object-oriented programming, and program design.',
+        'prerequisites': 'None',
+        'department_code': 'COMPSCI',
+        'full_course_id': 'COMPSCI 61A',
+        'source_url': 'sample'
+    },
+    {
+        'subject': 'MATH',
+        'number': '1A',
+        'title': 'Calculus',
+        'units': '4',
+        'description': 'Limits, continuity, differentiation, and integration of functions of one variable.',
+        'prerequisites': 'None',
+        'department_code': 'MATH',
+        'full_course_id': 'MATH 1A',
+        'source_url': 'sample'
+    },
+    {
+        'subject': 'PHYSICS',
+        'number': '7A',
+        'title': 'Physics for Scientists and Engineers',
+        'units': '4',
+        'description': 'Mechanics, waves, and thermodynamics.',
+        'prerequisites': 'MATH 1A or equivalent',
+        'department_code': 'PHYSICS',
+        'full_course_id': 'PHYSICS 7A',
+        'source_url': 'sample'
+    },
+    {
+        'subject': 'CHEM',
+        'number': '1A',
+        'title': 'General Chemistry',
+        'units': '4',
+        'description': 'Atomic structure, chemical bonding, stoichiometry, and thermodynamics.',
+        'prerequisites': 'None',
+        'department_code': 'CHEM',
+        'full_course_id': 'CHEM 1A',
+        'source_url': 'sample'
+    },
+    {
+        'subject': 'ENGLISH',
+        'number': '1A',
+        'title': 'Reading and Composition',
+        'units': '4',
+        'description': 'Introduction to college-level reading and writing.',
+        'prerequisites': 'None',
+        'department_code': 'ENGLISH',
+        'full_course_id': 'ENGLISH 1A',
+        'source_url': 'sample'
+    }
+]))
+
 class BerkeleyCourseScraper:
     def __init__(self):
-        self.session = requests.Session()
+        if SCRAPE_CACHE:
+            import requests_cache
+            self.session = requests_cache.CachedSession(SCRAPE_CACHE, backend='sqlite', expire_after=SCRAPE_CACHE_EXPIRE)
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
-        self.courses = []
+        # Keep connections to the catalog hosts alive and back off on throttling/server errors
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Keyed by (subject, number) so a course mentioned on several pages is kept once
+        self.courses = {}
         
+    def add_courses(self, courses):
+        """Add courses, keeping the first record seen for each subject and number"""
+        for course in courses:
+            self.courses.setdefault((course['subject'], course['number']), course)
+    
+    def fetch_page(self, url):
+        """Fetch an HTML page body, capped at MAX_PAGE_BYTES; returns None for non-HTML responses"""
+        with self.session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            if 'html' not in response.headers.get('Content-Type', ''):
+                return None
+            return response.raw.read(MAX_PAGE_BYTES, decode_content=True)
+    
+    def page_text(self, content):
+        """Flatten an HTML page to its text with lxml, without building a BeautifulSoup tree"""
+        # Decode as BeautifulSoup would, then hand lxml plain UTF-8
+        markup = UnicodeDammit(content, is_html=True).unicode_markup.encode('utf-8')
+        try:
+            doc = lxml_html.document_fromstring(markup, parser=lxml_html.HTMLParser(encoding='utf-8'))
+        except etree.ParserError:
+            return ''
+        # get_text() leaves out script and style contents, so drop them too
+        etree.strip_elements(doc, 'script', 'style', 'template', with_tail=False)
+        return doc.text_content()
+    
     def try_undergraduate_catalog(self):
         """Try to scrape from the undergraduate catalog"""
         logger.info("Trying undergraduate catalog approach...")
@@ -33,9 +161,11 @@ class BerkeleyCourseScraper:
         # Try the undergraduate catalog courses page
         url = "https://undergraduate.catalog.berkeley.edu/courses/"
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            content = self.fetch_page(url)
+            if content is None:
+                logger.warning("Catalog courses page is not HTML")
+                return
+            soup = BeautifulSoup(content, 'lxml')
             
             # Look for course links
             course_links = []
@@ -55,38 +185,40 @@ class BerkeleyCourseScraper:
                         'name': text
                     })
             
-            logger.info(f"Found {len(course_links)} course links in catalog")
+            logger.info("Found %s course links in catalog", len(course_links))
             
-            # Scrape a few course pages to test
-            for link in course_links[:5]:  # Test first 5
-                self.scrape_course_page(link['url'], link['name'])
-                time.sleep(1)
+            # Scrape a few course pages to test, fetching them concurrently
+            links = course_links[:5]  # Test first 5
+            with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+                pages = executor.map(self.scrape_course_page, [l['url'] for l in links], [l['name'] for l in links])
+                for courses in pages:
+                    self.add_courses(courses)
                 
         except Exception as e:
-            logger.error(f"Error with undergraduate catalog: {e}")
+            logger.error("Error with undergraduate catalog: %s", e)
     
     def scrape_course_page(self, url, course_name):
-        """Scrape individual course page"""
+        """Scrape individual course page, returning the courses found"""
+        courses = []
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            content = self.fetch_page(url)
+            if content is None:
+                return courses
             # Extract course information
-            text = soup.get_text()
+            text = self.page_text(content)
             
             # Look for course code pattern
-            course_match = re.search(r'([A-Z]{2,})\s+(\d+[A-Z]?)', text)
+            course_match = COURSE_CODE_PATTERN.search(text)
             if course_match:
                 subject = course_match.group(1)
                 number = course_match.group(2)
                 
                 # Extract title
-                title_match = re.search(r'[A-Z]{2,}\s+\d+[A-Z]?\s*[-–]\s*(.+?)(?:\n|$)', text)
+                title_match = TITLE_PATTERN.search(text)
                 title = title_match.group(1).strip() if title_match else course_name
                 
                 # Extract units
-                units_match = re.search(r'(\d+(?:-\d+)?)\s*(?:units?|Units?)', text, re.IGNORECASE)
+                units_match = UNITS_PATTERN.search(text)
                 units = units_match.group(1) if units_match else ""
                 
                 # Extract description
@@ -96,10 +228,10 @@ class BerkeleyCourseScraper:
                     desc_end = len(text)
                 
                 description = text[desc_start:desc_end].strip()
-                description = re.sub(r'\s+', ' ', description)
+                description = WHITESPACE_PATTERN.sub(' ', description)
                 
                 # Extract prerequisites
-                prereq_match = re.search(r'Prerequisites?:\s*(.+?)(?:\n\n|\n[A-Z]|$)', text, re.IGNORECASE | re.DOTALL)
+                prereq_match = PREREQUISITES_PATTERN.search(text)
                 prerequisites = prereq_match.group(1).strip() if prereq_match else ""
                 
                 course_data = {
@@ -114,44 +246,46 @@ class BerkeleyCourseScraper:
                     'source_url': url
                 }
                 
-                self.courses.append(course_data)
-                logger.info(f"Scraped course: {subject} {number} - {title}")
+                courses.append(course_data)
+                logger.info("Scraped course: %s %s - %s", subject, number, title)
                 
         except Exception as e:
-            logger.error(f"Error scraping course page {url}: {e}")
+            logger.error("Error scraping course page %s: %s", url, e)
+        
+        return courses
     
     def try_department_pages(self):
         """Try to scrape from department pages"""
         logger.info("Trying department pages approach...")
         
-        # Common department codes
-        departments = [
-            'COMPSCI', 'MATH', 'PHYSICS', 'CHEM', 'BIOLOGY', 'ENGLISH', 'HISTORY',
-            'ECON', 'PSYCH', 'POLSCI', 'SOCIOL', 'ANTHRO', 'ART', 'MUSIC'
-        ]
-        
-        for dept in departments:
-            try:
-                # Try different URL patterns
-                urls_to_try = [
-                    f"https://undergraduate.catalog.berkeley.edu/courses/{dept.lower()}/",
-                    f"https://guide.berkeley.edu/courses/{dept.lower()}/",
-                    f"https://guide.berkeley.edu/programs/{dept.lower()}/"
-                ]
-                
-                for url in urls_to_try:
-                    try:
-                        response = self.session.get(url)
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.content, 'html.parser')
-                            text = soup.get_text()
-                            
-                            # Look for courses in this department
-                            course_pattern = rf'{dept}\s+(\d+[A-Z]?)'
-                            matches = re.findall(course_pattern, text)
-                            
-                            for number in matches:
-                                course_data = {
+        # Departments are fetched concurrently; results are kept in department order
+        with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+            for dept, courses in zip(DEPARTMENTS, executor.map(self.scrape_department, DEPARTMENTS)):
+                self.add_courses(courses)
+    
+    def scrape_department(self, dept):
+        """Scrape course numbers for one department from the first URL that lists them"""
+        try:
+            # Try different URL patterns
+            urls_to_try = [
+                f"https://undergraduate.catalog.berkeley.edu/courses/{dept.lower()}/",
+                f"https://guide.berkeley.edu/courses/{dept.lower()}/",
+                f"https://guide.berkeley.edu/programs/{dept.lower()}/"
+            ]
+            
+            for url in urls_to_try:
+                try:
+                    content = self.fetch_page(url)
+                    if content is not None:
+                        text = self.page_text(content)
+                        
+                        # Look for courses in this department
+                        matches = DEPARTMENT_COURSE_PATTERNS[dept].findall(text)
+                        
+                        if matches:
+                            logger.info("Found %s courses for %s", len(matches), dept)
+                            return [
+                                {
                                     'subject': dept,
                                     'number': number,
                                     'title': '',
@@ -162,84 +296,22 @@ class BerkeleyCourseScraper:
                                     'full_course_id': f"{dept} {number}",
                                     'source_url': url
                                 }
-                                self.courses.append(course_data)
+                                for number in matches
+                            ]
                             
-                            if matches:
-                                logger.info(f"Found {len(matches)} courses for {dept}")
-                                break
-                                
-                    except Exception as e:
-                        continue
-                        
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error with department {dept}: {e}")
+                except Exception as e:
+                    continue
+            
+        except Exception as e:
+            logger.error("Error with department %s: %s", dept, e)
+        
+        return []
     
     def create_sample_data(self):
         """Create sample course data for demonstration"""
         logger.info("Creating sample course data...")
-        
-        sample_courses = [
-            {
-                'subject': 'COMPSCI',
-                'number': '61A',
-                'title': 'The Structure and Interpretation of Computer Programs',
-                'units': '4',
-                'description': 'Introduction to programming and computer science. Emphasis on functional programming, data abstraction, object-oriented programming, and program design.',
-                'prerequisites': 'None',
-                'department_code': 'COMPSCI',
-                'full_course_id': 'COMPSCI 61A',
-                'source_url': 'sample'
-            },
-            {
-                'subject': 'MATH',
-                'number': '1A',
-                'title': 'Calculus',
-                'units': '4',
-                'description': 'Limits, continuity, differentiation, and integration of functions of one variable.',
-                'prerequisites': 'None',
-                'department_code': 'MATH',
-                'full_course_id': 'MATH 1A',
-                'source_url': 'sample'
-            },
-            {
-                'subject': 'PHYSICS',
-                'number': '7A',
-                'title': 'Physics for Scientists and Engineers',
-                'units': '4',
-                'description': 'Mechanics, waves, and thermodynamics.',
-                'prerequisites': 'MATH 1A or equivalent',
-                'department_code': 'PHYSICS',
-                'full_course_id': 'PHYSICS 7A',
-                'source_url': 'sample'
-            },
-            {
-                'subject': 'CHEM',
-                'number': '1A',
-                'title': 'General Chemistry',
-                'units': '4',
-                'description': 'Atomic structure, chemical bonding, stoichiometry, and thermodynamics.',
-                'prerequisites': 'None',
-                'department_code': 'CHEM',
-                'full_course_id': 'CHEM 1A',
-                'source_url': 'sample'
-            },
-            {
-                'subject': 'ENGLISH',
-                'number': '1A',
-                'title': 'Reading and Composition',
-                'units': '4',
-                'description': 'Introduction to college-level reading and writing.',
-                'prerequisites': 'None',
-                'department_code': 'ENGLISH',
-                'full_course_id': 'ENGLISH 1A',
-                'source_url': 'sample'
-            }
-        ]
-        
-        self.courses.extend(sample_courses)
-        logger.info(f"Added {len(sample_courses)} sample courses")
+        self.add_courses(SAMPLE_COURSES)
+        logger.info("Added %s sample courses", len(SAMPLE_COURSES))
     
     def scrape_all_courses(self):
         """Try multiple approaches to scrape courses"""
@@ -254,7 +326,7 @@ class BerkeleyCourseScraper:
             logger.info("Adding sample data for demonstration...")
             self.create_sample_data()
         
-        logger.info(f"Total courses scraped: {len(self.courses)}")
+        logger.info("Total courses scraped: %s", len(self.courses))
     
     def save_to_csv(self, filename='berkeley_courses_final.csv'):
         """Save to CSV"""
@@ -262,15 +334,20 @@ class BerkeleyCourseScraper:
             logger.warning("No courses to save")
             return
         
-        df = pd.DataFrame(self.courses)
-        df.to_csv(filename, index=False)
-        logger.info(f"Saved {len(self.courses)} courses to {filename}")
+        courses = list(self.courses.values())
+        
+        # Stream rows straight to disk; a DataFrame copy is only needed for the preview
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(courses[0]), lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(courses)
+        logger.info("Saved %s courses to %s", len(self.courses), filename)
         
         print(f"\nSummary:")
         print(f"Total courses: {len(self.courses)}")
-        print(f"Unique subjects: {df['subject'].nunique()}")
+        print(f"Unique subjects: {len({c['subject'] for c in courses})}")
         print(f"Sample courses:")
-        print(df[['subject', 'number', 'title', 'units']].head(10).to_string(index=False))
+        print(pd.DataFrame(courses[:10], columns=['subject', 'number', 'title', 'units']).to_string(index=False))
 
 def main():
     scraper = BerkeleyCourseScraper()
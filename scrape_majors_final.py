@@ -5,26 +5,288 @@ Scrapes major requirements and creates sample data
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-from bs4 import BeautifulSoup
-import time
+from bs4 import BeautifulSoup, UnicodeDammit
+from lxml import etree, html as lxml_html
 import re
+import csv
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import logging
+import os
+from types import MappingProxyType
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Set up logging; SCRAPE_LOG_LEVEL=WARNING hides per-page progress
+logging.basicConfig(level=os.getenv('SCRAPE_LOG_LEVEL', 'INFO'), format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Pages fetched at once; the session's connection pool is larger than this
+SCRAPE_WORKERS = 8
+
+# Bodies past this size are truncated before parsing; seconds to wait on a page
+MAX_PAGE_BYTES = 2_000_000
+REQUEST_TIMEOUT = 10
+
+# Set SCRAPE_CACHE to a cache name to replay pages from SQLite during development
+SCRAPE_CACHE = os.getenv('SCRAPE_CACHE')
+SCRAPE_CACHE_EXPIRE = 86400
+
+# Course codes such as "COMPSCI 61A", compiled once at import
+COURSE_CODE_PATTERN = re.compile(r'([A-Z]{2,})\s+(\d+[A-Z]?)')
+
+# Context keywords that mark a requirement type, highest priority first
+REQUIREMENT_TYPES = ('elective', 'prerequisite', 'breadth', 'core')
+REQUIREMENT_TYPE_PATTERN = re.compile('|'.join(REQUIREMENT_TYPES), re.IGNORECASE)
+
+# Colleges named on program pages, checked in this order
+COLLEGE_INDICATORS = (
+    'College of Engineering',
+    'College of Letters and Science',
+    'College of Chemistry',
+    'College of Environmental Design',
+    'Haas School of Business',
+    'School of Public Health',
+    'School of Social Welfare',
+    'School of Education',
+    'School of Information',
+    'School of Optometry',
+    'School of Public Policy'
+)
+
+# Simple mapping of common program names to codes
+PROGRAM_CODES = {
+    'Computer Science': 'CS',
+    'Mathematics': 'MATH',
+    'Physics': 'PHYSICS',
+    'Chemistry': 'CHEM',
+    'Biology': 'BIO',
+    'English': 'ENGLISH',
+    'History': 'HISTORY',
+    'Economics': 'ECON',
+    'Psychology': 'PSYCH',
+    'Political Science': 'POLSCI',
+    'Sociology': 'SOCIOL',
+    'Anthropology': 'ANTHRO'
+}
+
+# Demonstration requirements used when scraping finds too little; read-only since every scraper shares them
+SAMPLE_REQUIREMENTS = tuple(map(MappingProxyType, [
+    # Computer Science Major
+    {
+        'program_name': 'Computer Science',
+        'program_code': 'CS',
+        'program_url': 'sample',
+        'college': 'College of Engineering',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'COMPSCI',
+        'course_number': '61A',
+        'course_title': 'The Structure and Interpretation of Computer Programs',
+        'full_course_id': 'COMPSCI 61A',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Core programming course'
+    },
+    {
+        'program_name': 'Computer Science',
+        'program_code': 'CS',
+        'program_url': 'sample',
+        'college': 'College of Engineering',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'COMPSCI',
+        'course_number': '61B',
+        'course_title': 'Data Structures',
+        'full_course_id': 'COMPSCI 61B',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Prerequisite: COMPSCI 61A'
+    },
+    {
+        'program_name': 'Computer Science',
+        'program_code': 'CS',
+        'program_url': 'sample',
+        'college': 'College of Engineering',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'MATH',
+        'course_number': '1A',
+        'course_title': 'Calculus',
+        'full_course_id': 'MATH 1A',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Mathematics requirement'
+    },
+    # Mathematics Major
+    {
+        'program_name': 'Mathematics',
+        'program_code': 'MATH',
+        'program_url': 'sample',
+        'college': 'College of Letters and Science',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'MATH',
+        'course_number': '1A',
+        'course_title': 'Calculus',
+        'full_course_id': 'MATH 1A',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Core mathematics course'
+    },
+    {
+        'program_name': 'Mathematics',
+        'program_code': 'MATH',
+        'program_url': 'sample',
+        'college': 'College of Letters and Science',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'MATH',
+        'course_number': '1B',
+        'course_title': 'Calculus',
+        'full_course_id': 'MATH 1B',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Prerequisite: MATH 1A'
+    },
+    # Physics Major
+    {
+        'program_name': 'Physics',
+        'program_code': 'PHYSICS',
+        'program_url': 'sample',
+        'college': 'College of Letters and Science',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'PHYSICS',
+        'course_number': '7A',
+        'course_title': 'Physics for Scientists and Engineers',
+        'full_course_id': 'PHYSICS 7A',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Core physics course'
+    },
+    {
+        'program_name': 'Physics',
+        'program_code': 'PHYSICS',
+        'program_url': 'sample',
+        'college': 'College of Letters and Science',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'MATH',
+        'course_number': '1A',
+        'course_title': 'Calculus',
+        'full_course_id': 'MATH 1A',
+        'requirement_type': 'prerequisite',
+        'units': '4',
+        'notes': 'Required for physics courses'
+    },
+    # Chemistry Major
+    {
+        'program_name': 'Chemistry',
+        'program_code': 'CHEM',
+        'program_url': 'sample',
+        'college': 'College of Chemistry',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'CHEM',
+        'course_number': '1A',
+        'course_title': 'General Chemistry',
+        'full_course_id': 'CHEM 1A',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Core chemistry course'
+    },
+    # English Major
+    {
+        'program_name': 'English',
+        'program_code': 'ENGLISH',
+        'program_url': 'sample',
+        'college': 'College of Letters and Science',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Lower Division Requirements',
+        'course_subject': 'ENGLISH',
+        'course_number': '1A',
+        'course_title': 'Reading and Composition',
+        'full_course_id': 'ENGLISH 1A',
+        'requirement_type': 'required',
+        'units': '4',
+        'notes': 'Core English course'
+    },
+    # Breadth Requirements (for all majors)
+    {
+        'program_name': 'All Majors',
+        'program_code': 'ALL',
+        'program_url': 'sample',
+        'college': 'All Colleges',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Breadth Requirements',
+        'course_subject': 'HISTORY',
+        'course_number': '1A',
+        'course_title': 'Introduction to History',
+        'full_course_id': 'HISTORY 1A',
+        'requirement_type': 'breadth',
+        'units': '4',
+        'notes': 'Historical Studies breadth'
+    },
+    {
+        'program_name': 'All Majors',
+        'program_code': 'ALL',
+        'program_url': 'sample',
+        'college': 'All Colleges',
+        'degree_type': "Bachelor's",
+        'requirement_section': 'Breadth Requirements',
+        'course_subject': 'PSYCH',
+        'course_number': '1',
+        'course_title': 'Introduction to Psychology',
+        'full_course_id': 'PSYCH 1',
+        'requirement_type': 'breadth',
+        'units': '4',
+        'notes': 'Social and Behavioral Sciences breadth'
+    }
+]))
+
 class BerkeleyMajorScraper:
     def __init__(self):
-        self.session = requests.Session()
+        if SCRAPE_CACHE:
+            import requests_cache
+            self.session = requests_cache.CachedSession(SCRAPE_CACHE, backend='sqlite', expire_after=SCRAPE_CACHE_EXPIRE)
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Keep connections to the catalog hosts alive and back off on throttling/server errors
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.requirements = []
         
+    def fetch_page(self, url):
+        """Fetch an HTML page body, capped at MAX_PAGE_BYTES; returns None for non-HTML responses"""
+        with self.session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            if 'html' not in response.headers.get('Content-Type', ''):
+                return None
+            return response.raw.read(MAX_PAGE_BYTES, decode_content=True)
+    
+    def page_text(self, content):
+        """Flatten an HTML page to its text with lxml, without building a BeautifulSoup tree"""
+        # Decode as BeautifulSoup would, then hand lxml plain UTF-8
+        markup = UnicodeDammit(content, is_html=True).unicode_markup.encode('utf-8')
+        try:
+            doc = lxml_html.document_fromstring(markup, parser=lxml_html.HTMLParser(encoding='utf-8'))
+        except etree.ParserError:
+            return ''
+        # get_text() leaves out script and style contents, so drop them too
+        etree.strip_elements(doc, 'script', 'style', 'template', with_tail=False)
+        return doc.text_content()
+    
     def try_undergraduate_catalog(self):
         """Try to scrape from the undergraduate catalog programs page"""
         logger.info("Trying undergraduate catalog programs approach...")
@@ -32,9 +294,11 @@ class BerkeleyMajorScraper:
         # Try the undergraduate catalog programs page
         url = "https://undergraduate.catalog.berkeley.edu/programs/"
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            content = self.fetch_page(url)
+            if content is None:
+                logger.warning("Catalog programs page is not HTML")
+                return
+            soup = BeautifulSoup(content, 'lxml')
             
             # Look for program links
             program_links = []
@@ -54,25 +318,27 @@ class BerkeleyMajorScraper:
                         'name': text
                     })
             
-            logger.info(f"Found {len(program_links)} program links in catalog")
+            logger.info("Found %s program links in catalog", len(program_links))
             
-            # Scrape a few program pages to test
-            for link in program_links[:5]:  # Test first 5
-                self.scrape_program_page(link['url'], link['name'])
-                time.sleep(1)
+            # Scrape a few program pages to test, fetching them concurrently
+            links = program_links[:5]  # Test first 5
+            with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+                pages = executor.map(self.scrape_program_page, [l['url'] for l in links], [l['name'] for l in links])
+                for requirements in pages:
+                    self.requirements.extend(requirements)
                 
         except Exception as e:
-            logger.error(f"Error with undergraduate catalog: {e}")
+            logger.error("Error with undergraduate catalog: %s", e)
     
     def scrape_program_page(self, url, program_name):
-        """Scrape individual program page"""
+        """Scrape individual program page, returning the requirements found"""
+        requirements = []
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            content = self.fetch_page(url)
+            if content is None:
+                return requirements
             # Extract program information
-            text = soup.get_text()
+            text = self.page_text(content)
             
             # Determine college
             college = self.extract_college(text)
@@ -80,21 +346,31 @@ class BerkeleyMajorScraper:
             # Determine degree type
             degree_type = self.extract_degree_type(text)
             
+            # Program code depends only on the name, not on each course
+            program_code = self.extract_program_code(program_name)
+            
             # Look for course requirements
-            course_pattern = r'([A-Z]{2,})\s+(\d+[A-Z]?)'
-            course_matches = re.findall(course_pattern, text)
+            course_matches = COURSE_CODE_PATTERN.findall(text)
+            
+            # Courses are mentioned many times per page; list and locate each one only once
+            seen_courses = set()
             
             for subject, number in course_matches:
                 # Skip if it looks like a year or other number
                 if number.isdigit() and int(number) > 300:
                     continue
                 
+                course_id = f"{subject} {number}"
+                if course_id in seen_courses:
+                    continue
+                seen_courses.add(course_id)
+                
                 # Determine requirement type based on context
-                req_type = self.determine_requirement_type(text, f"{subject} {number}")
+                req_type = self.determine_requirement_type(text, text.find(course_id))
                 
                 requirement_data = {
                     'program_name': program_name,
-                    'program_code': self.extract_program_code(program_name),
+                    'program_code': program_code,
                     'program_url': url,
                     'college': college,
                     'degree_type': degree_type,
@@ -102,37 +378,25 @@ class BerkeleyMajorScraper:
                     'course_subject': subject,
                     'course_number': number,
                     'course_title': '',
-                    'full_course_id': f"{subject} {number}",
+                    'full_course_id': course_id,
                     'requirement_type': req_type,
                     'units': '',
                     'notes': ''
                 }
                 
-                self.requirements.append(requirement_data)
+                requirements.append(requirement_data)
             
-            if course_matches:
-                logger.info(f"Found {len(course_matches)} course requirements for {program_name}")
+            if requirements:
+                logger.info("Found %s course requirements for %s", len(requirements), program_name)
                 
         except Exception as e:
-            logger.error(f"Error scraping program page {url}: {e}")
+            logger.error("Error scraping program page %s: %s", url, e)
+        
+        return requirements
     
     def extract_college(self, text):
         """Extract college information from text"""
-        college_indicators = [
-            'College of Engineering',
-            'College of Letters and Science',
-            'College of Chemistry',
-            'College of Environmental Design',
-            'Haas School of Business',
-            'School of Public Health',
-            'School of Social Welfare',
-            'School of Education',
-            'School of Information',
-            'School of Optometry',
-            'School of Public Policy'
-        ]
-        
-        for college in college_indicators:
+        for college in COLLEGE_INDICATORS:
             if college in text:
                 return college
         
@@ -150,23 +414,7 @@ class BerkeleyMajorScraper:
     
     def extract_program_code(self, program_name):
         """Extract program code from program name"""
-        # Simple mapping of common program names to codes
-        program_codes = {
-            'Computer Science': 'CS',
-            'Mathematics': 'MATH',
-            'Physics': 'PHYSICS',
-            'Chemistry': 'CHEM',
-            'Biology': 'BIO',
-            'English': 'ENGLISH',
-            'History': 'HISTORY',
-            'Economics': 'ECON',
-            'Psychology': 'PSYCH',
-            'Political Science': 'POLSCI',
-            'Sociology': 'SOCIOL',
-            'Anthropology': 'ANTHRO'
-        }
-        
-        for name, code in program_codes.items():
+        for name, code in PROGRAM_CODES.items():
             if name in program_name:
                 return code
         
@@ -176,209 +424,27 @@ class BerkeleyMajorScraper:
             return ''.join([word[0] for word in words[:2]]).upper()
         return program_name[:4].upper()
     
-    def determine_requirement_type(self, text, course_id):
-        """Determine requirement type based on context"""
-        # Find the course in the text and look at surrounding context
-        course_pos = text.find(course_id)
+    def determine_requirement_type(self, text, course_pos):
+        """Determine requirement type based on the context around a course's position"""
         if course_pos == -1:
             return "required"
         
-        # Get context around the course
+        # Scan the context around the course once for every keyword
         start = max(0, course_pos - 100)
         end = min(len(text), course_pos + 100)
-        context = text[start:end].lower()
+        found = {keyword.lower() for keyword in REQUIREMENT_TYPE_PATTERN.findall(text, start, end)}
         
-        if "elective" in context:
-            return "elective"
-        elif "prerequisite" in context:
-            return "prerequisite"
-        elif "breadth" in context:
-            return "breadth"
-        elif "core" in context:
-            return "core"
-        else:
-            return "required"
+        # Keywords are checked in priority order, not in order of appearance
+        for requirement_type in REQUIREMENT_TYPES:
+            if requirement_type in found:
+                return requirement_type
+        return "required"
     
     def create_sample_data(self):
         """Create sample major requirements data"""
         logger.info("Creating sample major requirements data...")
-        
-        sample_requirements = [
-            # Computer Science Major
-            {
-                'program_name': 'Computer Science',
-                'program_code': 'CS',
-                'program_url': 'sample',
-                'college': 'College of Engineering',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'COMPSCI',
-                'course_number': '61A',
-                'course_title': 'The Structure and Interpretation of Computer Programs',
-                'full_course_id': 'COMPSCI 61A',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Core programming course'
-            },
-            {
-                'program_name': 'Computer Science',
-                'program_code': 'CS',
-                'program_url': 'sample',
-                'college': 'College of Engineering',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'COMPSCI',
-                'course_number': '61B',
-                'course_title': 'Data Structures',
-                'full_course_id': 'COMPSCI 61B',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Prerequisite: COMPSCI 61A'
-            },
-            {
-                'program_name': 'Computer Science',
-                'program_code': 'CS',
-                'program_url': 'sample',
-                'college': 'College of Engineering',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'MATH',
-                'course_number': '1A',
-                'course_title': 'Calculus',
-                'full_course_id': 'MATH 1A',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Mathematics requirement'
-            },
-            # Mathematics Major
-            {
-                'program_name': 'Mathematics',
-                'program_code': 'MATH',
-                'program_url': 'sample',
-                'college': 'College of Letters and Science',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'MATH',
-                'course_number': '1A',
-                'course_title': 'Calculus',
-                'full_course_id': 'MATH 1A',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Core mathematics course'
-            },
-            {
-                'program_name': 'Mathematics',
-                'program_code': 'MATH',
-                'program_url': 'sample',
-                'college': 'College of Letters and Science',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'MATH',
-                'course_number': '1B',
-                'course_title': 'Calculus',
-                'full_course_id': 'MATH 1B',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Prerequisite: MATH 1A'
-            },
-            # Physics Major
-            {
-                'program_name': 'Physics',
-                'program_code': 'PHYSICS',
-                'program_url': 'sample',
-                'college': 'College of Letters and Science',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'PHYSICS',
-                'course_number': '7A',
-                'course_title': 'Physics for Scientists and Engineers',
-                'full_course_id': 'PHYSICS 7A',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Core physics course'
-            },
-            {
-                'program_name': 'Physics',
-                'program_code': 'PHYSICS',
-                'program_url': 'sample',
-                'college': 'College of Letters and Science',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'MATH',
-                'course_number': '1A',
-                'course_title': 'Calculus',
-                'full_course_id': 'MATH 1A',
-                'requirement_type': 'prerequisite',
-                'units': '4',
-                'notes': 'Required for physics courses'
-            },
-            # Chemistry Major
-            {
-                'program_name': 'Chemistry',
-                'program_code': 'CHEM',
-                'program_url': 'sample',
-                'college': 'College of Chemistry',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'CHEM',
-                'course_number': '1A',
-                'course_title': 'General Chemistry',
-                'full_course_id': 'CHEM 1A',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Core chemistry course'
-            },
-            # English Major
-            {
-                'program_name': 'English',
-                'program_code': 'ENGLISH',
-                'program_url': 'sample',
-                'college': 'College of Letters and Science',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Lower Division Requirements',
-                'course_subject': 'ENGLISH',
-                'course_number': '1A',
-                'course_title': 'Reading and Composition',
-                'full_course_id': 'ENGLISH 1A',
-                'requirement_type': 'required',
-                'units': '4',
-                'notes': 'Core English course'
-            },
-            # Breadth Requirements (for all majors)
-            {
-                'program_name': 'All Majors',
-                'program_code': 'ALL',
-                'program_url': 'sample',
-                'college': 'All Colleges',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Breadth Requirements',
-                'course_subject': 'HISTORY',
-                'course_number': '1A',
-                'course_title': 'Introduction to History',
-                'full_course_id': 'HISTORY 1A',
-                'requirement_type': 'breadth',
-                'units': '4',
-                'notes': 'Historical Studies breadth'
-            },
-            {
-                'program_name': 'All Majors',
-                'program_code': 'ALL',
-                'program_url': 'sample',
-                'college': 'All Colleges',
-                'degree_type': "Bachelor's",
-                'requirement_section': 'Breadth Requirements',
-                'course_subject': 'PSYCH',
-                'course_number': '1',
-                'course_title': 'Introduction to Psychology',
-                'full_course_id': 'PSYCH 1',
-                'requirement_type': 'breadth',
-                'units': '4',
-                'notes': 'Social and Behavioral Sciences breadth'
-            }
-        ]
-        
-        self.requirements.extend(sample_requirements)
-        logger.info(f"Added {len(sample_requirements)} sample requirements")
+        self.requirements.extend(SAMPLE_REQUIREMENTS)
+        logger.info("Added %s sample requirements", len(SAMPLE_REQUIREMENTS))
     
     def scrape_all_majors(self):
         """Try multiple approaches to scrape major requirements"""
@@ -391,7 +457,7 @@ class BerkeleyMajorScraper:
         logger.info("Adding sample data for demonstration...")
         self.create_sample_data()
         
-        logger.info(f"Total requirements scraped: {len(self.requirements)}")
+        logger.info("Total requirements scraped: %s", len(self.requirements))
     
     def save_to_csv(self, filename='berkeley_major_requirements_final.csv'):
         """Save to CSV"""
@@ -399,16 +465,19 @@ class BerkeleyMajorScraper:
             logger.warning("No requirements to save")
             return
         
-        df = pd.DataFrame(self.requirements)
-        df.to_csv(filename, index=False)
-        logger.info(f"Saved {len(self.requirements)} requirements to {filename}")
+        # Stream rows straight to disk; a DataFrame copy is only needed for the preview
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.requirements[0]), lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(self.requirements)
+        logger.info("Saved %s requirements to %s", len(self.requirements), filename)
         
         print(f"\nSummary:")
-        print(f"Total programs: {df['program_name'].nunique()}")
+        print(f"Total programs: {len({r['program_name'] for r in self.requirements})}")
         print(f"Total requirements: {len(self.requirements)}")
-        print(f"Colleges represented: {df['college'].nunique()}")
+        print(f"Colleges represented: {len({r['college'] for r in self.requirements})}")
         print(f"Sample requirements:")
-        print(df[['program_name', 'requirement_section', 'full_course_id', 'requirement_type']].head(10).to_string(index=False))
+        print(pd.DataFrame(self.requirements[:10], columns=['program_name', 'requirement_section', 'full_course_id', 'requirement_type']).to_string(index=False))
 
 def main():
     scraper = BerkeleyMajorScraper()